@@ -1,8 +1,14 @@
 import os
-import re
 import numpy as np
 import pandas as pd
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # 未安装 pyarrow 时回退到 pandas 自带的 C 解析器
+    pa = pa_csv = pq = None
+
 # ============ 路径 ============
 # 使用相对路径（基于当前脚本位置），便于在不同机器/目录运行
 BASE = os.path.dirname(os.path.abspath(__file__))
@@ -11,200 +17,300 @@ ARTWORKS_CSV = os.path.join(BASE, "artworks.csv")
 OUTDIR = os.path.join(BASE, "data", "processed")
 os.makedirs(OUTDIR, exist_ok=True)
 
+
 # ============ 读取 ============
-artists = pd.read_csv(ARTISTS_CSV)
-artworks = pd.read_csv(ARTWORKS_CSV)
-
-# ============ 统一主键：Artist ID ============
-artists["Artist ID"] = artists["Artist ID"].astype(str).str.strip()
-artworks["Artist ID"] = artworks["Artist ID"].astype(str).str.strip()
-# 如有“1234, 5678”取第一个（简化版本，后期可做“爆炸”处理）
-artworks["Artist ID"] = artworks["Artist ID"].str.split(",").str[0].str.strip()
-
-
-# ============ Gender 归一化 ============
-def norm_gender(x: str) -> str:
-    s = str(x).strip().lower()
-    if s in ("", "nan", "none", "unknown", "unspecified", "n/a", "null"):
-        return "Unknown"
-    # 常见写法
-    if s.startswith("f"):
-        return "Female"
-    if s.startswith("m"):
-        return "Male"
-    if "non" in s or "nb" in s or "non-b" in s or "binary" in s:
-        return "Non-binary"
-    return s.title()
-
-
-artists["Gender"] = artists["Gender"].apply(norm_gender)
-# 若你希望“只统计已知性别”，可去掉 Unknown：
-# artists = artists[artists["Gender"].isin(["Male","Female","Non-binary"])]
-
-# 补充常用字段：出生年、国籍，转数字
-artists["Birth Year"] = pd.to_numeric(artists.get("Birth Year"), errors="coerce")
-artists["Nationality"] = artists.get("Nationality")
-
-# ============ 合并艺术家信息到作品 ============
-df = artworks.merge(
-    artists[["Artist ID", "Gender", "Birth Year", "Nationality"]],
-    on="Artist ID",
-    how="left",
-)
-
-# ============ 时间口径 1：收藏年份（Acquisition Year） ============
-df["Acquisition Date"] = pd.to_datetime(df.get("Acquisition Date"), errors="coerce")
-df["year_acq"] = df["Acquisition Date"].dt.year
-
-# —— 严谨计数口径：
-# “每位艺术家在同一年只计一次”，避免某艺术家在同年多件作品导致重复计数
-df_acq_unique = df.dropna(subset=["year_acq"]).drop_duplicates(
-    ["Artist ID", "year_acq"]
-)
-
-# 1A) 按年 × 性别
-gender_by_year_acq = (
-    df_acq_unique.groupby(["year_acq", "Gender"])
-    .size()
-    .reset_index(name="count")
-    .rename(columns={"year_acq": "year"})
-)
-gender_by_year_acq["total"] = gender_by_year_acq.groupby("year")["count"].transform(
-    "sum"
-)
-gender_by_year_acq["share"] = gender_by_year_acq["count"] / gender_by_year_acq["total"]
-
-# 1B) 按年 × 部门 × 性别（同样按“艺术家-年”去重后的视角）
-df_acq_unique = df_acq_unique.dropna(subset=["Department"])
-gender_by_dept_acq = (
-    df_acq_unique.groupby(["year_acq", "Department", "Gender"])
-    .size()
-    .reset_index(name="count")
-    .rename(columns={"year_acq": "year"})
-)
-gender_by_dept_acq["total"] = gender_by_dept_acq.groupby(["year", "Department"])[
-    "count"
-].transform("sum")
-gender_by_dept_acq["share"] = gender_by_dept_acq["count"] / gender_by_dept_acq["total"]
-
-# ============ 时间口径 2：艺术家出生年（Birth Year） ============
-# 这里按“人”为单位（每位艺术家只算一次），看不同出生年里男女比例
-artists_birth = artists.dropna(subset=["Birth Year"]).copy()
-gender_by_birth_year = (
-    artists_birth.groupby(["Birth Year", "Gender"])
-    .size()
-    .reset_index(name="count")
-    .rename(columns={"Birth Year": "birth_year"})
-)
-gender_by_birth_year["total"] = gender_by_birth_year.groupby("birth_year")[
-    "count"
-].transform("sum")
-gender_by_birth_year["share"] = (
-    gender_by_birth_year["count"] / gender_by_birth_year["total"]
-)
-
-# 也可以做“出生年代（十年为单位）”
-artists_birth["birth_decade"] = (artists_birth["Birth Year"] // 10) * 10
-gender_by_birth_decade = (
-    artists_birth.groupby(["birth_decade", "Gender"]).size().reset_index(name="count")
-)
-gender_by_birth_decade["total"] = gender_by_birth_decade.groupby("birth_decade")[
-    "count"
-].transform("sum")
-gender_by_birth_decade["share"] = (
-    gender_by_birth_decade["count"] / gender_by_birth_decade["total"]
-)
-
-
-# ============ 时间口径 3：作品创作年（Creation Year） ============
-# MoMA 的作品日期字段常在 artworks["Date"]，包含 “c. 1950”, “1950–52”, “1990s” 等
-def parse_creation_year(txt) -> float | None:
-    if pd.isna(txt):
-        return np.nan
-    s = str(txt).lower().strip()
-    # 1990s → 1990
-    m_decade = re.search(r"(\d{3})0s", s)
-    if m_decade:
-        try:
-            return int(m_decade.group(1) + "0")
-        except Exception:
-            pass
-    # 抓取所有四位数年份（1000–2099范围内）
-    years = [int(y) for y in re.findall(r"\b(1[0-9]{3}|20[0-9]{2})\b", s)]
-    if not years:
-        return np.nan
-    # 若有范围，取中位数；若单一年份，直接用
-    return int(round(np.mean(years)))
-
-
-df["year_created"] = (
-    df.get("Date").apply(parse_creation_year) if "Date" in df.columns else np.nan
-)
-
-# 3A) 以“作品”为单位：每年创作的作品中性别占比
-# （此口径下，一个艺术家某年多件作品会多次计数）
-gender_by_creation_year_artworks = (
-    df.dropna(subset=["year_created"])
-    .groupby(["year_created", "Gender"])
-    .size()
-    .reset_index(name="count")
-    .rename(columns={"year_created": "year"})
-)
-gender_by_creation_year_artworks["total"] = gender_by_creation_year_artworks.groupby(
-    "year"
-)["count"].transform("sum")
-gender_by_creation_year_artworks["share"] = (
-    gender_by_creation_year_artworks["count"]
-    / gender_by_creation_year_artworks["total"]
-)
-
-# 3B) 以“人”为单位：某年“有作品创作”的唯一艺术家人数占比
-df_created_unique = df.dropna(subset=["year_created"]).drop_duplicates(
-    ["Artist ID", "year_created"]
-)
-gender_by_creation_year_artists = (
-    df_created_unique.groupby(["year_created", "Gender"])
-    .size()
-    .reset_index(name="count")
-    .rename(columns={"year_created": "year"})
-)
-gender_by_creation_year_artists["total"] = gender_by_creation_year_artists.groupby(
-    "year"
-)["count"].transform("sum")
-gender_by_creation_year_artists["share"] = (
-    gender_by_creation_year_artists["count"] / gender_by_creation_year_artists["total"]
-)
-
-# ============ 附：女性艺术家国籍分布（供地图用） ============
-female_geo = (
-    df_acq_unique[df_acq_unique["Gender"] == "Female"]
-    .groupby("Nationality")["Artist ID"]
-    .nunique()
-    .reset_index(name="female_artists")
-)
-# （如果要显示全部性别，可切换为不筛选 Gender）
-
-# ============ 导出 ============
-gender_by_year_acq.to_csv(f"{OUTDIR}/gender_by_year_acq.csv", index=False)
-gender_by_dept_acq.to_csv(f"{OUTDIR}/gender_by_dept_acq.csv", index=False)
-gender_by_birth_year.to_csv(f"{OUTDIR}/gender_by_birth_year.csv", index=False)
-gender_by_birth_decade.to_csv(f"{OUTDIR}/gender_by_birth_decade.csv", index=False)
-gender_by_creation_year_artworks.to_csv(
-    f"{OUTDIR}/gender_by_creation_year_artworks.csv", index=False
-)
-gender_by_creation_year_artists.to_csv(
-    f"{OUTDIR}/gender_by_creation_year_artists.csv", index=False
-)
-female_geo.to_csv(f"{OUTDIR}/female_geo.csv", index=False)
-
-print("✅ Saved to:", OUTDIR)
-for f in [
-    "gender_by_year_acq.csv",
-    "gender_by_dept_acq.csv",
-    "gender_by_birth_year.csv",
-    "gender_by_birth_decade.csv",
-    "gender_by_creation_year_artworks.csv",
-    "gender_by_creation_year_artists.csv",
-    "female_geo.csv",
-]:
-    print(" -", f)
+def read_csv(path, usecols, dtype):
+    """只读取 usecols 列；优先用 Arrow 多线程 CSV 解析器，缺少 pyarrow 时回退到 C 引擎。"""
+    if pa_csv is None:
+        return pd.read_csv(path, usecols=usecols, dtype=dtype, engine="c")
+    # artworks.csv 的标题等字段含换行，需开启 newlines_in_values；
+    # pandas 的 engine="pyarrow" 不暴露该选项，因此直接调用 pyarrow.csv
+    table = pa_csv.read_csv(
+        path,
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=usecols,
+            column_types={
+                c: (
+                    pa.dictionary(pa.int32(), pa.string())
+                    if t == "category"
+                    else pa.string()
+                )
+                for c, t in dtype.items()
+            },
+            strings_can_be_null=True,
+        ),
+    )
+    return table.to_pandas().astype(dtype)
+
+
+# ============ 占比统计 ============
+def shares(frame, keys, gcol="Gender"):
+    """按 keys × gcol 计数，并在 keys 组内求总数与占比（count / total / share）。
+
+    只做一次 groupby：宽表按行求和得到 total，再整体相除得到 share，
+    省去第二次 groupby(...).transform("sum")。
+    """
+    # 保留按键排序：应用端折线图 / 动画帧按行顺序绘制，需要年份有序
+    wide = (
+        frame.groupby(keys + [gcol], observed=True).size().unstack(gcol, fill_value=0)
+    )
+    total = wide.sum(axis=1)
+    out = pd.DataFrame(
+        {"count": wide.stack(), "share": wide.div(total, axis=0).stack()}
+    )
+    out["total"] = total.reindex(out.index.droplevel(gcol)).to_numpy()
+    # 只保留实际出现的 (keys, gcol) 组合，与 groupby().size() 的输出一致
+    out = out[out["count"] > 0].reset_index()
+    return out[keys + [gcol, "count", "total", "share"]]
+
+
+# ============ pandas 实现 ============
+def run_pandas(artists_csv, artworks_csv, outdir):
+    # 只读取下游用到的列，并显式指定 dtype，跳过无关字段的解析与 object 类型推断
+    # （Acquisition Date 中混有 “2016-10” 这类不完整日期，收藏年份在下方单独解析）
+    artists = read_csv(
+        artists_csv,
+        usecols=["Artist ID", "Gender", "Birth Year", "Nationality"],
+        dtype={"Artist ID": "string", "Gender": "category", "Nationality": "category"},
+    )
+    artworks = read_csv(
+        artworks_csv,
+        usecols=["Artist ID", "Acquisition Date", "Department", "Date"],
+        dtype={
+            "Artist ID": "string",
+            "Acquisition Date": "string",
+            "Department": "category",
+            "Date": "string",
+        },
+    )
+
+    # ============ 统一主键：Artist ID ============
+    artists["Artist ID"] = artists["Artist ID"].astype(str).str.strip()
+    aid = artworks["Artist ID"].astype(str).str.strip()
+    # 如有“1234, 5678”取第一个（简化版本，后期可做“爆炸”处理）
+    # 绝大多数作品只有一个 ID：只对含逗号的行做 split，避免为每行构造列表
+    multi = aid.str.contains(",", regex=False, na=False)
+    aid.loc[multi] = aid.loc[multi].str.split(",", n=1).str[0].str.strip()
+    artworks["Artist ID"] = aid
+
+    # 两表共用一套 int32 编码：合并、去重、计数都在整数键上完成，字符串 ID 仅随表携带
+    # （缺失 ID 编码为 -1，与原先 NaN 键的去重口径一致）
+    aid_codes, _ = pd.factorize(
+        pd.concat([artists["Artist ID"], artworks["Artist ID"]], ignore_index=True)
+    )
+    artists["artist_code"] = aid_codes[: len(artists)].astype(np.int32)
+    artworks["artist_code"] = aid_codes[len(artists) :].astype(np.int32)
+
+    # ============ Gender 归一化 ============
+    # 向量化处理：先统一小写/去空格，再用布尔掩码按优先级映射（Unknown > f > m > non-binary）
+    g = artists["Gender"].astype("string").str.strip().str.lower()
+    g_unknown = (
+        g.isin(["", "nan", "none", "unknown", "unspecified", "n/a", "null"]) | g.isna()
+    )
+    g_female = g.str.startswith("f", na=False)
+    g_male = g.str.startswith("m", na=False)
+    g_nb = g.str.contains("non|nb|binary", regex=True, na=False)
+    artists["Gender"] = np.select(
+        [
+            g_unknown.to_numpy(bool),
+            g_female.to_numpy(bool),
+            g_male.to_numpy(bool),
+            g_nb.to_numpy(bool),
+        ],
+        ["Unknown", "Female", "Male", "Non-binary"],
+        default=g.str.title().to_numpy(dtype=object),
+    )
+    # 若你希望“只统计已知性别”，可去掉 Unknown：
+    # artists = artists[artists["Gender"].isin(["Male","Female","Non-binary"])]
+
+    # 补充常用字段：出生年、国籍，转数字
+    artists["Birth Year"] = pd.to_numeric(artists.get("Birth Year"), errors="coerce")
+    artists["Nationality"] = artists.get("Nationality")
+
+    # ============ 合并艺术家信息到作品 ============
+    # 以 Artist ID 编码为索引做左连接（单次哈希），不再经由 merge 重建整张表
+    artists_idx = artists.set_index("artist_code")[
+        ["Gender", "Birth Year", "Nationality"]
+    ]
+    df = artworks.join(artists_idx, on="artist_code")
+    # 分组键统一转为 category：groupby 直接使用整数编码，避免逐行哈希字符串
+    for c in ("Gender", "Department", "Nationality"):
+        df[c] = df[c].astype("category")
+
+    # ============ 时间口径 1：收藏年份（Acquisition Year） ============
+    # Acquisition Date 为 ISO 格式（YYYY-MM-DD），直接截取前四位转数字，无需构造 datetime；
+    # 仅采用完整日期，“2016-10” 这类不完整日期与原先 to_datetime 的口径一致记为缺失
+    acq = df["Acquisition Date"].astype("string")
+    df["year_acq"] = pd.to_numeric(
+        acq.str.slice(0, 4).where(acq.str.len() == 10), errors="coerce"
+    ).astype("float64")
+
+    # —— 严谨计数口径：
+    # “每位艺术家在同一年只计一次”，避免某艺术家在同年多件作品导致重复计数
+    # （用布尔掩码一次筛选，省去 dropna + drop_duplicates 的两次整表复制）
+    df_acq_unique = df.loc[
+        df["year_acq"].notna() & ~df.duplicated(["artist_code", "year_acq"])
+    ]
+
+    # 1A) 按年 × 性别
+    gender_by_year_acq = shares(df_acq_unique, ["year_acq"]).rename(
+        columns={"year_acq": "year"}
+    )
+
+    # 1B) 按年 × 部门 × 性别（同样按“艺术家-年”去重后的视角）
+    df_acq_unique = df_acq_unique.dropna(subset=["Department"])
+    gender_by_dept_acq = shares(df_acq_unique, ["year_acq", "Department"]).rename(
+        columns={"year_acq": "year"}
+    )
+
+    # ============ 时间口径 2：艺术家出生年（Birth Year） ============
+    # 这里按“人”为单位（每位艺术家只算一次），看不同出生年里男女比例
+    artists_birth = artists.dropna(subset=["Birth Year"]).copy()
+    artists_birth["Gender"] = artists_birth["Gender"].astype("category")
+    gender_by_birth_year = shares(artists_birth, ["Birth Year"]).rename(
+        columns={"Birth Year": "birth_year"}
+    )
+
+    # 也可以做“出生年代（十年为单位）”
+    # 整数运算取年代，结果转回 float64，与 birth_year 等其它年份列的输出类型一致
+    artists_birth["birth_decade"] = (
+        (artists_birth["Birth Year"].to_numpy().astype(np.int32) // 10) * 10
+    ).astype("float64")
+    gender_by_birth_decade = shares(artists_birth, ["birth_decade"])
+
+    # ============ 时间口径 3：作品创作年（Creation Year） ============
+    # MoMA 的作品日期字段常在 artworks["Date"]，包含 “c. 1950”, “1950–52”, “1990s” 等
+    # 向量化解析（两次整列正则提取，替代逐行 apply）：
+    #   1) “1990s” → 1990；
+    #   2) 抓取所有四位数年份（1000–2099范围内），若有范围取均值并四舍五入，单一年份直接用
+    date_s = df["Date"].astype("string").str.lower().str.strip()
+    year_decade = date_s.str.extract(r"(\d{3})0s", expand=False).astype("float") * 10
+    year_mean = (
+        date_s.str.extractall(r"\b(1[0-9]{3}|20[0-9]{2})\b")[0]
+        .astype("float")
+        .groupby(level=0, sort=False)
+        .mean()
+        .round()
+        .reindex(df.index)
+    )
+    df["year_created"] = year_decade.fillna(year_mean)
+
+    # 3A) 以“作品”为单位：每年创作的作品中性别占比
+    # （此口径下，一个艺术家某年多件作品会多次计数）
+    gender_by_creation_year_artworks = shares(
+        df.dropna(subset=["year_created"]), ["year_created"]
+    ).rename(columns={"year_created": "year"})
+
+    # 3B) 以“人”为单位：某年“有作品创作”的唯一艺术家人数占比
+    df_created_unique = df.loc[
+        df["year_created"].notna() & ~df.duplicated(["artist_code", "year_created"])
+    ]
+    gender_by_creation_year_artists = shares(
+        df_created_unique, ["year_created"]
+    ).rename(columns={"year_created": "year"})
+
+    # ============ 附：女性艺术家国籍分布（供地图用） ============
+    # 先按艺术家去重（每人一行），再按国籍计数，省去分组内逐个哈希 ID 的 nunique
+    female_geo = (
+        df_acq_unique.loc[
+            df_acq_unique["Gender"] == "Female", ["artist_code", "Nationality"]
+        ]
+        .drop_duplicates("artist_code")
+        .groupby("Nationality", observed=True, sort=False)
+        .size()
+        .reset_index(name="female_artists")
+    )
+    # （如果要显示全部性别，可切换为不筛选 Gender）
+
+    # ============ 附：作品级年龄底表（供 streamlit_app 年龄分析用） ============
+    # 直接复用上面合并好的 df，应用端无需再读取、合并两份原始 CSV；
+    # 年龄与年龄段也在这里一次算好，应用端只做读取
+    df_age = df.dropna(subset=["Birth Year", "year_acq"])[
+        ["Artist ID", "Gender", "Birth Year", "year_acq", "year_created"]
+    ]
+
+    # 收藏时年龄：去掉异常（<=10 或 >=100）
+    df_age["acquisition_age"] = df_age["year_acq"] - df_age["Birth Year"]
+    df_age = df_age[
+        (df_age["acquisition_age"] > 10) & (df_age["acquisition_age"] < 100)
+    ]
+    # 年龄均为整数：用 np.digitize 按各段下界分箱（等价于原 pd.cut 的右闭区间），
+    # 再由编码直接构造 Categorical，省去 IntervalIndex 的构建
+    df_age["age_group"] = pd.Categorical.from_codes(
+        np.digitize(df_age["acquisition_age"].to_numpy(), [30, 40, 50, 60, 70, 80]),
+        categories=["<30", "30–39", "40–49", "50–59", "60–69", "70+", "80+"],
+        ordered=True,
+    )
+
+    # 创作时年龄：无法解析创作年或超出 (10, 100) 的作品记为缺失，不影响收藏年龄统计
+    creation_age = df_age["year_created"] - df_age["Birth Year"]
+    df_age["creation_age"] = creation_age.where(
+        (creation_age > 10) & (creation_age < 100)
+    )
+    creation_codes = np.digitize(
+        df_age["creation_age"].to_numpy(), [20, 30, 40, 50, 60, 70, 80, 90]
+    )
+    df_age["creation_age_group"] = pd.Categorical.from_codes(
+        # 缺失的创作年龄编码为 -1（即 NaN），不能落入最后一段
+        np.where(df_age["creation_age"].isna(), -1, creation_codes),
+        categories=[
+            "<20",
+            "20–29",
+            "30–39",
+            "40–49",
+            "50–59",
+            "60–69",
+            "70–79",
+            "80–89",
+            "90+",
+        ],
+        ordered=True,
+    )
+
+    # ============ 导出 ============
+    # 输出为 Parquet（列式 + zstd 压缩），读取时无需再做 CSV 解析与类型推断；
+    # Gender / Department / Nationality 先转为 category，落盘后保持字典编码。
+    # 所有表统一经一个循环转为 Arrow Table 后由 pyarrow 直接写出；
+    # 未安装 pyarrow 时改用 DataFrame.to_parquet（可用 fastparquet，否则由 pandas 报错提示）
+    tables = {
+        "gender_by_year_acq": gender_by_year_acq,
+        "gender_by_dept_acq": gender_by_dept_acq,
+        "gender_by_birth_year": gender_by_birth_year,
+        "gender_by_birth_decade": gender_by_birth_decade,
+        "gender_by_creation_year_artworks": gender_by_creation_year_artworks,
+        "gender_by_creation_year_artists": gender_by_creation_year_artists,
+        "female_geo": female_geo,
+        "df_age": df_age,
+    }
+    for name, t in tables.items():
+        for c in ("Gender", "Department", "Nationality"):
+            if c in t.columns:
+                t[c] = t[c].astype("category").cat.remove_unused_categories()
+        path = f"{outdir}/{name}.parquet"
+        if pq is None:
+            t.to_parquet(path, compression="zstd", index=False)
+            continue
+        pq.write_table(
+            pa.Table.from_pandas(t, preserve_index=False), path, compression="zstd"
+        )
+
+    print("✅ Saved to:", outdir)
+    for name in tables:
+        print(" -", f"{name}.parquet")
+
+
+# ============ 入口：Polars（默认）/ pandas ============
+# 默认整条 ETL 交给 finalproject_polars（惰性 + 多线程）；设置环境变量 USE_POLARS=0
+# 或未安装 polars 时，走上方的 pandas 实现 run_pandas，两者输出一致
+USE_POLARS = os.environ.get("USE_POLARS", "1") != "0"
+if USE_POLARS:
+    try:
+        from finalproject_polars import run as run_polars
+    except ImportError:
+        USE_POLARS = False
+
+if USE_POLARS:
+    run_polars(ARTISTS_CSV, ARTWORKS_CSV, OUTDIR)
+else:
+    run_pandas(ARTISTS_CSV, ARTWORKS_CSV, OUTDIR)
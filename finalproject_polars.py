@@ -0,0 +1,188 @@
+"""finalproject.py 的 Polars 实现：惰性扫描两份 CSV，多线程完成清洗、合并与分组统计，
+结果经 sink_parquet 直接落盘。输出的文件名、列名与口径和 pandas 版本保持一致。"""
+
+import os
+import polars as pl
+
+UNKNOWN_GENDER = ["", "nan", "none", "unknown", "unspecified", "n/a", "null"]
+AGE_LABELS = ["<30", "30–39", "40–49", "50–59", "60–69", "70+", "80+"]
+CREATION_AGE_LABELS = [
+    "<20",
+    "20–29",
+    "30–39",
+    "40–49",
+    "50–59",
+    "60–69",
+    "70–79",
+    "80–89",
+    "90+",
+]
+CATEGORY_COLS = ("Gender", "Department", "Nationality")
+
+
+def norm_gender(col):
+    # 与 pandas 版相同的优先级：Unknown > f > m > non-binary，其余取首字母大写
+    g = col.str.strip_chars().str.to_lowercase()
+    return (
+        pl.when(g.is_null() | g.is_in(UNKNOWN_GENDER))
+        .then(pl.lit("Unknown"))
+        .when(g.str.starts_with("f"))
+        .then(pl.lit("Female"))
+        .when(g.str.starts_with("m"))
+        .then(pl.lit("Male"))
+        .when(g.str.contains("non|nb|binary"))
+        .then(pl.lit("Non-binary"))
+        .otherwise(g.str.to_titlecase())
+    )
+
+
+def parse_creation_year(col):
+    # “1990s” → 1990；否则取所有四位数年份（1000–2099）的均值并四舍五入
+    s = col.str.to_lowercase().str.strip_chars()
+    decade = s.str.extract(r"(\d{3})0s", 1).cast(pl.Float64) * 10
+    mean_year = (
+        s.str.extract_all(r"\b(1[0-9]{3}|20[0-9]{2})\b")
+        .list.eval(pl.element().cast(pl.Float64))
+        .list.mean()
+        .round(0)
+    )
+    return pl.coalesce(decade, mean_year)
+
+
+def shares(lf, keys, gcol="Gender"):
+    """按 keys × gcol 计数，并在 keys 组内求总数与占比（count / total / share）。"""
+    return (
+        lf.drop_nulls(keys + [gcol])
+        .group_by(keys + [gcol])
+        .agg(pl.len().cast(pl.Int64).alias("count"))
+        .with_columns(total=pl.col("count").sum().over(keys))
+        .with_columns(share=pl.col("count") / pl.col("total"))
+        .sort(keys + [gcol])
+    )
+
+
+def run(artists_csv, artworks_csv, outdir):
+    # ============ 读取（惰性，只投影下游用到的列） ============
+    artists = (
+        pl.scan_csv(
+            artists_csv,
+            schema_overrides={"Artist ID": pl.String, "Birth Year": pl.Float64},
+        )
+        .select("Artist ID", "Gender", "Birth Year", "Nationality")
+        .with_columns(
+            pl.col("Artist ID").str.strip_chars(),
+            norm_gender(pl.col("Gender")).alias("Gender"),
+        )
+    )
+    artworks = (
+        pl.scan_csv(artworks_csv, schema_overrides={"Artist ID": pl.String})
+        .select("Artist ID", "Acquisition Date", "Department", "Date")
+        .with_columns(
+            # 如有“1234, 5678”取第一个
+            pl.col("Artist ID")
+            .str.replace(",.*", "")
+            .str.strip_chars(),
+        )
+    )
+
+    # ============ 合并 + 时间口径 ============
+    df = artworks.join(
+        artists, on="Artist ID", how="left", maintain_order="left"
+    ).with_columns(
+        year_acq=pl.col("Acquisition Date")
+        .str.to_date("%Y-%m-%d", strict=False)
+        .dt.year()
+        .cast(pl.Float64),
+        year_created=parse_creation_year(pl.col("Date")),
+    )
+
+    # 1) 收藏年份：每位艺术家在同一年只计一次
+    df_acq_unique = df.filter(pl.col("year_acq").is_not_null()).unique(
+        ["Artist ID", "year_acq"], keep="first", maintain_order=True
+    )
+    df_acq_dept = df_acq_unique.filter(pl.col("Department").is_not_null())
+    gender_by_year_acq = shares(df_acq_unique, ["year_acq"]).rename(
+        {"year_acq": "year"}
+    )
+    gender_by_dept_acq = shares(df_acq_dept, ["year_acq", "Department"]).rename(
+        {"year_acq": "year"}
+    )
+
+    # 2) 出生年 / 出生年代（以“人”为单位）
+    artists_birth = artists.filter(pl.col("Birth Year").is_not_null()).with_columns(
+        birth_decade=((pl.col("Birth Year").cast(pl.Int32) // 10) * 10).cast(pl.Float64)
+    )
+    gender_by_birth_year = shares(artists_birth, ["Birth Year"]).rename(
+        {"Birth Year": "birth_year"}
+    )
+    gender_by_birth_decade = shares(artists_birth, ["birth_decade"])
+
+    # 3) 创作年：以“作品”为单位 / 以“人”为单位
+    df_created = df.filter(pl.col("year_created").is_not_null())
+    df_created_unique = df_created.unique(
+        ["Artist ID", "year_created"], keep="first", maintain_order=True
+    )
+    gender_by_creation_year_artworks = shares(df_created, ["year_created"]).rename(
+        {"year_created": "year"}
+    )
+    gender_by_creation_year_artists = shares(
+        df_created_unique, ["year_created"]
+    ).rename({"year_created": "year"})
+
+    # 附：女性艺术家国籍分布
+    female_geo = (
+        df_acq_dept.filter(pl.col("Gender") == "Female")
+        .drop_nulls(["Nationality", "Artist ID"])
+        .unique("Artist ID")
+        .group_by("Nationality")
+        .agg(pl.len().cast(pl.Int64).alias("female_artists"))
+        .sort("Nationality")
+    )
+
+    # 附：作品级年龄底表（年龄与年龄段一次算好）
+    creation_age = pl.col("year_created") - pl.col("Birth Year")
+    df_age = (
+        df.filter(pl.col("Birth Year").is_not_null() & pl.col("year_acq").is_not_null())
+        .select("Artist ID", "Gender", "Birth Year", "year_acq", "year_created")
+        .with_columns(acquisition_age=pl.col("year_acq") - pl.col("Birth Year"))
+        .filter((pl.col("acquisition_age") > 10) & (pl.col("acquisition_age") < 100))
+        .with_columns(
+            age_group=pl.col("acquisition_age").cut(
+                [29, 39, 49, 59, 69, 79], labels=AGE_LABELS
+            ),
+            creation_age=pl.when((creation_age > 10) & (creation_age < 100)).then(
+                creation_age
+            ),
+        )
+        .with_columns(
+            creation_age_group=pl.col("creation_age").cut(
+                [19, 29, 39, 49, 59, 69, 79, 89], labels=CREATION_AGE_LABELS
+            )
+        )
+    )
+
+    # ============ 导出 ============
+    tables = {
+        "gender_by_year_acq": gender_by_year_acq,
+        "gender_by_dept_acq": gender_by_dept_acq,
+        "gender_by_birth_year": gender_by_birth_year,
+        "gender_by_birth_decade": gender_by_birth_decade,
+        "gender_by_creation_year_artworks": gender_by_creation_year_artworks,
+        "gender_by_creation_year_artists": gender_by_creation_year_artists,
+        "female_geo": female_geo,
+        "df_age": df_age,
+    }
+    sinks = []
+    for name, lf in tables.items():
+        cats = [c for c in CATEGORY_COLS if c in lf.collect_schema().names()]
+        sinks.append(
+            lf.with_columns(pl.col(cats).cast(pl.Categorical)).sink_parquet(
+                os.path.join(outdir, f"{name}.parquet"), compression="zstd", lazy=True
+            )
+        )
+    # 一次性执行全部查询计划，公共子计划（CSV 扫描、合并）只计算一次
+    pl.collect_all(sinks)
+
+    print("✅ Saved to:", outdir)
+    for name in tables:
+        print(" -", f"{name}.parquet")
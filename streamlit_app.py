@@ -7,7 +7,6 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
-from sklearn.linear_model import LinearRegression
 
 # -------------------------------------------
 # ⚙️ Page setup
@@ -23,40 +22,52 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 base = os.path.join(BASE_DIR, "data", "processed")
 
 
+def read_processed(name):
+    # 优先读取 finalproject.py 产出的 Parquet；缺失时回退到旧版 CSV
+    path = f"{base}/{name}.parquet"
+    if os.path.exists(path):
+        return pd.read_parquet(path)
+    return pd.read_csv(f"{base}/{name}.csv")
+
+
 @st.cache_data
 def load_data():
-    by_year = pd.read_csv(f"{base}/gender_by_year_acq.csv")
-    by_dept = pd.read_csv(f"{base}/gender_by_dept_acq.csv")
-    by_create = pd.read_csv(f"{base}/gender_by_creation_year_artworks.csv")
-    geo = pd.read_csv(f"{base}/female_geo.csv")
+    by_year = read_processed("gender_by_year_acq")
+    by_dept = read_processed("gender_by_dept_acq")
+    by_create = read_processed("gender_by_creation_year_artworks")
+    geo = read_processed("female_geo")
 
     # 清洗性别
     for df in [by_year, by_dept, by_create]:
         df["Gender"] = df["Gender"].astype(str).str.strip().str.title()
 
-    # 加载原始 artists & artworks（用于年龄计算）
-    artists = pd.read_csv(os.path.join(BASE_DIR, "artists.csv"))
-    artworks = pd.read_csv(os.path.join(BASE_DIR, "artworks.csv"))
-    artists["Artist ID"] = artists["Artist ID"].astype(str).str.strip()
-    artworks["Artist ID"] = artworks["Artist ID"].astype(str).str.strip()
-    artworks["Artist ID"] = artworks["Artist ID"].str.split(",").str[0].str.strip()
-
-    artists["Gender"] = artists["Gender"].astype(str).str.strip().str.title()
-    artists["Birth Year"] = pd.to_numeric(artists["Birth Year"], errors="coerce")
-    artworks["Acquisition Date"] = pd.to_datetime(
-        artworks["Acquisition Date"], errors="coerce"
+    # 年龄分析底表由 finalproject.py 预先合并并导出，无需再读取原始 CSV
+    # （acquisition_age / creation_age 及对应年龄段均已在 ETL 中算好）
+    df_age = pd.read_parquet(f"{base}/df_age.parquet")
+    return by_year, by_dept, by_create, geo, df_age
+
+
+@st.cache_data
+def fit_female_share(df):
+    # 女性占比随年份的一元线性回归，返回 (slope, intercept)；按输入数据缓存，
+    # 滑块等控件变化时无需重新拟合
+    female = df[df["Gender"] == "Female"]
+    slope, intercept = np.polyfit(
+        female["year"].to_numpy(), female["share"].to_numpy(), 1
     )
-    artworks["year_acq"] = artworks["Acquisition Date"].dt.year
+    return slope, intercept
+
 
-    df_age = artworks.merge(
-        artists[["Artist ID", "Gender", "Birth Year"]], on="Artist ID", how="left"
+def share_within(counts, level):
+    # counts 为 groupby(...).size() 的结果；在其余键组成的组内求 level 各取值的占比。
+    # 宽表按行求和即为组内总数，无需再做一次 groupby(...).transform("sum")
+    wide = counts.unstack(level, fill_value=0)
+    total = wide.sum(axis=1)
+    out = pd.DataFrame(
+        {"count": wide.stack(), "share": wide.div(total, axis=0).stack()}
     )
-    df_age = df_age.dropna(subset=["Birth Year", "year_acq"])
-    df_age["acquisition_age"] = df_age["year_acq"] - df_age["Birth Year"]
-    df_age = df_age[
-        (df_age["acquisition_age"] > 10) & (df_age["acquisition_age"] < 100)
-    ]
-    return by_year, by_dept, by_create, geo, df_age
+    out["total"] = total.reindex(out.index.droplevel(level)).to_numpy()
+    return out[out["count"] > 0].reset_index()
 
 
 by_year, by_dept, by_create, geo, df_age = load_data()
@@ -97,9 +108,8 @@ fig1.update_traces(line=dict(width=3))
 st.plotly_chart(fig1, use_container_width=True)
 
 # --- Regression prediction 2030 ---
-female = filtered[filtered["Gender"] == "Female"]
-model = LinearRegression().fit(female[["year"]], female["share"])
-pred_2030 = model.predict(np.array([[2030]]))[0]
+slope, intercept = fit_female_share(filtered)
+pred_2030 = slope * 2030 + intercept
 st.markdown(f"**📈 Predicted female share in 2030:** {pred_2030 * 100:.1f}%")
 
 # ===========================================
@@ -127,21 +137,13 @@ st.plotly_chart(fig2, use_container_width=True)
 # ===========================================
 st.subheader("3️⃣ Age at Time of Acquisition — Interactive Mosaic View")
 
-# --- 年龄段分箱 ---
-bins = [0, 29, 39, 49, 59, 69, 79, 100]
-labels = ["<30", "30–39", "40–49", "50–59", "60–69", "70+", "80+"]
-df_age["age_group"] = pd.cut(
-    df_age["acquisition_age"], bins=bins, labels=labels, include_lowest=True
-)
-
 # --- 每年 × 年龄段 × 性别 统计 ---
-age_share = (
-    df_age.groupby(["year_acq", "age_group", "Gender"]).size().reset_index(name="count")
-)
-age_share["total"] = age_share.groupby(["year_acq", "age_group"])["count"].transform(
-    "sum"
+# observed=True：只统计实际出现的组合，不展开年龄段 × 性别的全部笛卡尔积；
+# 分组保持排序，动画帧按年份顺序播放
+age_share = share_within(
+    df_age.groupby(["year_acq", "age_group", "Gender"], observed=True).size(),
+    "Gender",
 )
-age_share["share"] = age_share["count"] / age_share["total"]
 
 # --- 平均年龄差距 ---
 avg_age_m = df_age[df_age["Gender"] == "Male"]["acquisition_age"].mean()
@@ -156,14 +158,22 @@ st.markdown(
 )
 
 
-fig_ani = px.bar(
-    age_share.query("Gender == 'Female' and year_acq >= 1950 and year_acq <= 2020"),
-    x="age_group",
-    y="share",
-    animation_frame="year_acq",
-    range_y=[0, 1],
-    title="Animated Age Distribution of Female Artists (1950–2020)",
-    template="plotly_white",
+@st.cache_data
+def build_age_fig(female_share):
+    # 每年一帧的动画图构建开销大：按输入数据缓存整张图，控件触发重跑时直接复用
+    return px.bar(
+        female_share,
+        x="age_group",
+        y="share",
+        animation_frame="year_acq",
+        range_y=[0, 1],
+        title="Animated Age Distribution of Female Artists (1950–2020)",
+        template="plotly_white",
+    )
+
+
+fig_ani = build_age_fig(
+    age_share.query("Gender == 'Female' and year_acq >= 1950 and year_acq <= 2020")
 )
 st.plotly_chart(fig_ani, use_container_width=True)
 # ===========================================
@@ -173,31 +183,8 @@ st.subheader(
     "🧩 Age at Time of Creation — Comparing Artistic vs Institutional Timelines"
 )
 
-
-# 提取作品创作年份
-def parse_creation_year(txt):
-    if pd.isna(txt):
-        return np.nan
-    s = str(txt).lower()
-    # 提取四位年份，如 1950, 1992
-    years = [int(y) for y in re.findall(r"\b(1[0-9]{3}|20[0-9]{2})\b", s)]
-    if not years:
-        return np.nan
-    return int(np.mean(years))
-
-
-import re
-
-df_age["year_created"] = (
-    df_age.get("Date").apply(parse_creation_year)
-    if "Date" in df_age.columns
-    else np.nan
-)
-df_age = df_age.dropna(subset=["year_created"])
-df_age["creation_age"] = df_age["year_created"] - df_age["Birth Year"]
-
-# 去掉异常（负数或>100）
-df_age = df_age[(df_age["creation_age"] > 10) & (df_age["creation_age"] < 100)]
+# 只保留可解析创作年、且创作时年龄在 (10, 100) 内的作品
+df_age = df_age.dropna(subset=["creation_age"])
 
 # 平均年龄差
 avg_create_m = df_age[df_age["Gender"] == "Male"]["creation_age"].mean()
@@ -212,52 +199,36 @@ st.markdown(
     f"🧮 **Gender Gap in Creation Age:** {create_gap:.1f} years (positive = men older)"
 )
 
-# 可视化：动画比较年龄结构变化
-age_create_bins = [10, 19, 29, 39, 49, 59, 69, 79, 89, 100]
-age_create_labels = [
-    "<20",
-    "20–29",
-    "30–39",
-    "40–49",
-    "50–59",
-    "60–69",
-    "70–79",
-    "80–89",
-    "90+",
-]
-
-df_age["creation_age_group"] = pd.cut(
-    df_age["creation_age"],
-    bins=age_create_bins,
-    labels=age_create_labels,
-    include_lowest=True,
-)
-
 # 每年创作的作品中不同年龄段的分布
-create_share = (
-    df_age.groupby(["year_created", "creation_age_group", "Gender"])
-    .size()
-    .reset_index(name="count")
+create_share = share_within(
+    df_age.groupby(
+        ["year_created", "creation_age_group", "Gender"], observed=True
+    ).size(),
+    "creation_age_group",
 )
-create_share["total"] = create_share.groupby(["year_created", "Gender"])[
-    "count"
-].transform("sum")
-create_share["share"] = create_share["count"] / create_share["total"]
 
-# Animated bar
-fig_create = px.bar(
+
+# Animated bar（同样按输入数据缓存）
+@st.cache_data
+def build_creation_fig(female_share):
+    return px.bar(
+        female_share,
+        x="creation_age_group",
+        y="share",
+        animation_frame="year_created",
+        range_y=[0, 1],
+        title="Animated Age Distribution of Female Artists at Time of Creation (1900–2020)",
+        labels={"creation_age_group": "Age at Creation", "share": "Female Share"},
+        color="creation_age_group",
+        color_discrete_sequence=px.colors.sequential.Magenta,
+        template="plotly_white",
+    )
+
+
+fig_create = build_creation_fig(
     create_share.query(
         "Gender == 'Female' and year_created >= 1900 and year_created <= 2020"
-    ),
-    x="creation_age_group",
-    y="share",
-    animation_frame="year_created",
-    range_y=[0, 1],
-    title="Animated Age Distribution of Female Artists at Time of Creation (1900–2020)",
-    labels={"creation_age_group": "Age at Creation", "share": "Female Share"},
-    color="creation_age_group",
-    color_discrete_sequence=px.colors.sequential.Magenta,
-    template="plotly_white",
+    )
 )
 st.plotly_chart(fig_create, use_container_width=True)
 
@@ -283,7 +254,7 @@ st.markdown(
 # 4️⃣ Global Geography
 # ===========================================
 # 读取地理文件
-geo = pd.read_csv(f"{base}/female_geo.csv")
+geo = read_processed("female_geo")
 geo["Nationality"] = geo["Nationality"].astype(str).str.strip()
 
 # 手动标准化常见的非标准国家名
@@ -413,10 +384,10 @@ st.markdown("## 🧭 Institutional Equity Explorer")
 # --- Forecast simulator
 st.markdown("### 🔮 Forecast Simulator — Explore 2030 and Beyond")
 female = by_year[by_year["Gender"] == "Female"]
-model = LinearRegression().fit(female[["year"]], female["share"])
+slope, intercept = fit_female_share(by_year)
 
 future_year = st.slider("Select forecast year", 2020, 2050, 2030, step=1)
-pred_future = model.predict(np.array([[future_year]]))[0]
+pred_future = slope * future_year + intercept
 
 st.markdown(
     f"#### 📈 Predicted female share in **{future_year}**: **{pred_future * 100:.1f}%**"
@@ -424,7 +395,7 @@ st.markdown(
 
 # --- Forecast line chart
 years_ext = np.arange(1950, future_year + 1)
-pred_trend = model.predict(years_ext.reshape(-1, 1))
+pred_trend = slope * years_ext + intercept
 fig_pred = px.line(
     x=years_ext,
     y=pred_trend,